@@ -408,7 +408,8 @@ class Article(AmcatModel):
                 yield aid
 
     @classmethod
-    def create_articles(cls, articles, articleset=None, articlesets=None, deduplicate=True, monitor=NullMonitor()):
+    def create_articles(cls, articles, articleset=None, articlesets=None, deduplicate=True, monitor=NullMonitor(),
+                        add_to_index=True):
         """
         Add the given articles to the database, the index, and the given set
 
@@ -416,6 +417,7 @@ class Article(AmcatModel):
 
         @param articles: a collection of objects with the necessary properties (.title etc)
         @param articleset(s): articleset object(s), specify either or none
+        @param add_to_index: add the articles (and their set memberships) to the index
         """
         monitor = monitor.submonitor(total=6)
         if articlesets is None:
@@ -461,8 +463,11 @@ class Article(AmcatModel):
             result = bulk_insert_returning_ids(to_insert)
             for a, inserted in zip(to_insert, result):
                 a.id = inserted.id
-            dicts = [a.get_article_dict(sets=[aset.id for aset in articlesets]) for a in to_insert]
-            amcates.ES().bulk_insert(dicts, batch_size=100, monitor=monitor)
+            if add_to_index:
+                dicts = [a.get_article_dict(sets=[aset.id for aset in articlesets]) for a in to_insert]
+                amcates.ES().bulk_insert(dicts, batch_size=100, monitor=monitor)
+            else:
+                monitor.update()
         else:
             monitor.update()
 
@@ -486,7 +491,7 @@ class Article(AmcatModel):
                 monitor.update()
 
             if dupes:
-                aset.add_articles(dupes, add_to_index=True, monitor=monitor)
+                aset.add_articles(dupes, add_to_index=add_to_index, monitor=monitor)
             else:
                 monitor.update()
 
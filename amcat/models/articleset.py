@@ -211,6 +211,31 @@ class ArticleSet(AmcatModel):
         monitor.update(message="Deleting from cache")
         self._reset_property_cache()
 
+    @classmethod
+    def remove_articles_from_sets(cls, articlesets, articles, remove_from_index=True):
+        """
+        Remove articles from multiple articlesets. Like remove_articles, but removes set
+        memberships and CodedArticles of all sets using a single query each.
+
+        @param articlesets: articlesets to remove the articles from
+        @type articlesets: iterable of ArticleSet objects
+
+        @param articles: articles to be removed
+        @type articles: iterable with indexing of integers or Article objects
+        """
+        articlesets = set(articlesets)
+        if not articlesets:
+            return
+
+        to_remove = {(art if type(art) is int else art.id) for art in articles}
+        ArticleSetArticle.objects.filter(articleset__in=articlesets, article__in=to_remove).delete()
+        CodedArticle.objects.filter(codingjob__articleset__in=articlesets, article__in=to_remove).delete()
+
+        for aset in articlesets:
+            if remove_from_index:
+                amcates.ES().remove_from_set(aset.id, to_remove)
+            aset._reset_property_cache()
+
     def get_article_ids(self, use_elastic=False) -> Set[int]:
         """
         Return the sequence of ids of articles in this set.
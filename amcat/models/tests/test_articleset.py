@@ -106,6 +106,21 @@ class TestArticleSet(amcattest.AmCATTestCase):
         self.assertRaises(elasticsearch.NotFoundError, ES().get, arts[0].id)
         self.assertEqual(ES().get(arts[6].id)['id'], arts[6].id)
 
+    @amcattest.use_elastic
+    def test_remove_articles_from_sets(self):
+        a1, a2 = amcattest.create_test_article(), amcattest.create_test_article()
+        s1, s2, s3 = [amcattest.create_test_set() for _ in range(3)]
+        for aset in (s1, s2, s3):
+            aset.add_articles([a1, a2])
+
+        ArticleSet.remove_articles_from_sets([s1, s2], [a1])
+        ES().refresh()
+
+        for aset in (s1, s2):
+            self.assertEqual(set(aset.articles.values_list("pk", flat=True)), {a2.id})
+            self.assertEqual(aset.get_article_ids(use_elastic=True), {a2.id})
+        self.assertEqual(set(s3.articles.values_list("pk", flat=True)), {a1.id, a2.id})
+
     @amcattest.use_elastic
     def test_property_cache(self):
         aset = amcattest.create_test_set()
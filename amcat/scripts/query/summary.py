@@ -25,6 +25,7 @@ from django import forms
 from django.forms import IntegerField, BooleanField
 from django.template import Context
 from django.template.loader import get_template
+from django.utils.safestring import mark_safe
 from typing import Sequence
 
 from amcat.forms.forms import order_fields
@@ -64,7 +65,9 @@ def get_fragments(query: str, article_ids: Sequence[int], fragment_size=150, num
                 fragment = "<p>... " + " ...</p><p>... ".join(h.strip().replace("\n", " ") for h in highlights) + " ...</p>"
             else:
                 fragment = highlights[0]
-            setattr(articles[article_id], field, fragment)
+            # Fragments are escaped by highlight_fragments(), so prevent the template from
+            # escaping them (again).
+            setattr(articles[article_id], field, mark_safe(fragment))
     return articles.values()
 
 @order_fields(("offset", "size", "number_of_fragments", "fragment_size", "show_fields"))
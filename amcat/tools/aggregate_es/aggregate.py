@@ -24,21 +24,21 @@ import itertools
 __all__ = ("aggregate",)
 
 
-def flatten(aggregation, categories, categories_values=()):
-    aggregation = iter(categories.pop(0).parse_aggregation_result(aggregation))
+def flatten(aggregation, categories, categories_values=(), i=0):
+    """Flatten a (nested) aggregation result into rows. Instead of copying `categories`
+    and `categories_values` for each recursive call, we pass the index `i` of the
+    category currently being processed."""
+    aggregation = categories[i].parse_aggregation_result(aggregation)
 
     seen = set()
-    if not categories:
+    if i + 1 == len(categories):
         for key, aggr in aggregation:
             if categories_values:
                 seen.add(key)
             yield [key, aggr["doc_count"]]
     else:
         for key, sub in aggregation:
-            values = categories_values[1:] if categories_values else ()
-            flattened = flatten(sub, list(categories), list(values))
-
-            for row in flattened:
+            for row in flatten(sub, categories, categories_values, i + 1):
                 yield [key] + row
 
             if categories_values:
@@ -46,27 +46,27 @@ def flatten(aggregation, categories, categories_values=()):
 
     # Fill zeros
     if categories_values:
-        not_seen = categories_values[0] - seen
+        not_seen = categories_values[i] - seen
         missing = [not_seen]
-        missing.extend(categories_values[1:])
+        missing.extend(categories_values[i+1:])
         if missing:
             for subvals in map(list, itertools.product(*missing)):
                 subvals.append(0)
                 yield subvals
 
 
-def build_aggregate(categories):
-    aggregation = dict(categories.pop(0).get_aggregation())
+def build_aggregate(categories, i=0):
+    aggregation = dict(categories[i].get_aggregation())
 
-    if categories:
-        sub_aggregation = build_aggregate(categories)
+    if i + 1 < len(categories):
+        sub_aggregation = build_aggregate(categories, i + 1)
         for aggr in aggregation.values():
             aggr["aggregations"] = sub_aggregation
 
     return aggregation
 
 def build_query(query, filters, categories):
-    yield "aggregations", build_aggregate(list(categories))
+    yield "aggregations", build_aggregate(tuple(categories))
 
     if query is not None or filters is not None:
         from amcat.tools.amcates import build_body
@@ -80,13 +80,14 @@ def aggregate(query=None, filters=None, categories=(), objects=True, es=None, fl
     if not categories:
         raise ValueError("You need to specify at least one category.")
 
+    categories = tuple(categories)
     body = dict(build_query(query, filters, categories))
     raw_result = (es or ES()).search(body, search_type="count")
-    aggregation = list(flatten(raw_result["aggregations"], list(categories)))
+    aggregation = list(flatten(raw_result["aggregations"], categories))
 
     if not filter_zeros:
         values = list(map(set, zip(*aggregation)))[:-1]
-        aggregation = list(flatten(raw_result["aggregations"], list(categories), values))
+        aggregation = list(flatten(raw_result["aggregations"], categories, values))
 
     # Convert to suitable Python value
     for i, category in enumerate(categories):
@@ -194,12 +194,15 @@ class TermCategory(Category):
         return (dict(build_body(t.query)) for t in self.terms.values())
 
     def get_aggregation(self):
-        for label, body in zip(self.terms.keys(), self.bodies):
-            yield label, {"filter": body}
+        # Use a single 'filters' aggregation, so elastic evaluates all terms in one
+        # pass over the matching documents instead of one 'filter' aggregation per term.
+        filters = dict(zip(self.terms.keys(), self.bodies))
+        yield "terms", {"filters": {"filters": filters}}
 
     def parse_aggregation_result(self, result):
+        buckets = result["terms"]["buckets"]
         for label in self.terms:
-            yield label, result[label]
+            yield label, buckets[label]
 
     def get_column_names(self):
         return self.terms.keys()
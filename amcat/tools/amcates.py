@@ -33,6 +33,12 @@ from typing import Union
 from django.conf import settings
 from elasticsearch import Elasticsearch, NotFoundError
 from elasticsearch.helpers import scan, bulk
+from elasticsearch.serializer import JSONSerializer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 import amcat.models
 from amcat.tools import queryparser, toolkit
@@ -259,12 +265,28 @@ class ElasticSearchError(Exception):
     pass
 
 
+class FastJSONSerializer(JSONSerializer):
+    """
+    Serializer which parses responses using orjson (if installed). Large aggregation
+    responses are parsed considerably faster and with a lower peak memory usage.
+    """
+    def loads(self, s):
+        if orjson is None:
+            return super(FastJSONSerializer, self).loads(s)
+        try:
+            return orjson.loads(s)
+        except (ValueError, TypeError):
+            # Let the default serializer raise a proper SerializationError
+            return super(FastJSONSerializer, self).loads(s)
+
+
 class _ES(object):
     def __init__(self, index, doc_type, host, port, timeout=300, **args):
         self.host = host
         self.port = port
         self.index = index
         self.doc_type = doc_type
+        args.setdefault("serializer", FastJSONSerializer())
         self.es = Elasticsearch(hosts=[{"host": self.host, "port": self.port}, ], timeout=timeout, **args)
 
     def check_properties(self, properties):
@@ -658,42 +680,45 @@ class _ES(object):
         result = self.search(body, size=0, search_type="count", **options)
         return result['aggregations']['aggregation']
 
-    def _parse_terms_aggregate(self, aggregate, group_by, terms, sets):
-        if not group_by:
+    def _parse_terms_aggregate(self, aggregate, group_by, i, terms, sets):
+        if i == len(group_by):
             for term in terms:
                 yield term, aggregate[term.label]['doc_count']
         else:
             for term in terms:
-                yield term, self._parse_aggregate(aggregate[term.label], list(group_by), terms, sets)
+                yield term, self._parse_aggregate(aggregate[term.label], group_by, terms, sets, i)
 
-    def _parse_other_aggregate(self, aggregate, group_by, group, terms, sets):
+    def _parse_other_aggregate(self, aggregate, group_by, i, group, terms, sets):
         buckets = aggregate[group]["buckets"]
-        if not group_by:
+        if i == len(group_by):
             return ((b['key'], b['doc_count']) for b in buckets)
-        return ((b['key'], self._parse_aggregate(b, list(group_by), terms, sets)) for b in buckets)
+        return ((b['key'], self._parse_aggregate(b, group_by, terms, sets, i)) for b in buckets)
 
-    def _parse_aggregate(self, aggregate, group_by, terms, sets):
-        """Parse a aggregation result to (nested) namedtuples."""
-        group = group_by.pop(0)
+    def _parse_aggregate(self, aggregate, group_by, terms, sets, i=0):
+        """Parse a aggregation result to (nested) namedtuples. `group_by` is a tuple which
+        is not copied on recursion; `i` points to the group currently being parsed."""
+        group = group_by[i]
+        nested = i + 1 < len(group_by)
 
         if group == "terms":
-            result = self._parse_terms_aggregate(aggregate, group_by, terms, sets)
+            result = self._parse_terms_aggregate(aggregate, group_by, i + 1, terms, sets)
         else:
-            result = self._parse_other_aggregate(aggregate, group_by, group, terms, sets)
+            result = self._parse_other_aggregate(aggregate, group_by, i + 1, group, terms, sets)
             if group == "sets" and sets is not None:
                 # Filter sets if 'sets' is given
-                result = ((aset_id, res) for aset_id, res in result if aset_id in set(sets))
+                sets = set(sets)
+                result = ((aset_id, res) for aset_id, res in result if aset_id in sets)
             elif group == "date":
                 # Parse timestamps as datetime objects
                 result = ((get_date(stamp), aggr) for stamp, aggr in result)
 
         # Return results as namedtuples
-        ntuple = namedtuple("Aggr", [group, "buckets" if group_by else "count"])
+        ntuple = namedtuple("Aggr", [group, "buckets" if nested else "count"])
         return [ntuple(*r) for r in result]
 
-    def _build_aggregate(self, group_by, date_interval, terms, sets):
+    def _build_aggregate(self, group_by, date_interval, terms, sets, i=0):
         """Build nested aggregation query for list of groups"""
-        group = group_by.pop(0)
+        group = group_by[i]
 
         if group == 'date':
             aggregation = {
@@ -724,8 +749,8 @@ class _ES(object):
 
         # We need to nest the other aggregations, see:
         # http://www.elasticsearch.org/guide/en/elasticsearch/reference/current/search-aggregations.html
-        if group_by:
-            nested = self._build_aggregate(group_by, date_interval, terms, sets)
+        if i + 1 < len(group_by):
+            nested = self._build_aggregate(group_by, date_interval, terms, sets, i + 1)
             for aggr in aggregation.values():
                 aggr["aggregations"] = nested
 
@@ -753,8 +778,9 @@ class _ES(object):
         if "terms" in group_by and terms is None:
             raise ValueError("You should pass a list of terms if aggregating on it.")
 
+        group_by = tuple(group_by)
         filters = dict(build_body(query, filters, query_as_filter=True))
-        aggregations = self._build_aggregate(list(group_by), date_interval, terms, sets)
+        aggregations = self._build_aggregate(group_by, date_interval, terms, sets)
 
         body = {
             "query": {"constant_score": filters},
@@ -763,7 +789,7 @@ class _ES(object):
 
         log.debug("es.search(body={body})".format(**locals()))
         result = self.search(body)
-        result = self._parse_aggregate(result["aggregations"], list(group_by), terms, sets)
+        result = self._parse_aggregate(result["aggregations"], group_by, terms, sets)
         return result
 
     def statistics(self, query=None, filters=None):
@@ -600,18 +600,15 @@ class ESQuerySet:
             }
 
         # HACK: Elastic does not escape html tags *in the article*. We therefore pass a random
-        # marker and use it to escape ourselves.
-        double_random_mark = random_mark + random_mark
+        # (alphanumeric) marker, escape everything, and replace the escaped markers by the real tags.
+        # Markers present in the article itself end up escaped twice, so they are not replaced.
+        random_open, random_close = "&lt;{}&gt;".format(random_mark), "&lt;/{}&gt;".format(random_mark)
+        mark_open, mark_close = "<{}>".format(mark), "</{}>".format(mark)
         for article in articles.values():
             for field in list(article.keys()):
                 texts = article[field]
                 for i, text in enumerate(texts):
-                    text = text.replace("<{}>".format(random_mark), random_mark)
-                    text = text.replace("</{}>".format(random_mark), double_random_mark)
-                    text = html.escape(text)
-                    text = text.replace(double_random_mark, "</{}>".format(mark))
-                    text = text.replace(random_mark, "<{}>".format(mark))
-                    texts[i] = text
+                    texts[i] = html.escape(text).replace(random_open, mark_open).replace(random_close, mark_close)
 
         return articles
 
@@ -25,12 +25,26 @@ Also paves the way for more customization, i.e. allowing Lexis style queries
 """
 
 import collections
+import functools
 import itertools
+import os
+import re
+import sys
 
 from amcat.tools.toolkit import strip_accents
 from pyparsing import ParserElement, ParseException
 
-ParserElement.enablePackrat()
+# The operatorPrecedence grammar below re-matches the same terms at each precedence
+# level, which is what packrat memoization is meant for. Set to False to benchmark
+# without it.
+USE_PACKRAT = True
+
+if USE_PACKRAT:
+    ParserElement.enablePackrat()
+
+# Queries are parsed by QueryParser below. Set this environment variable to parse them
+# using the (slower) pyparsing grammar instead.
+USE_LEGACY_PARSER = bool(os.environ.get("AMCAT_LEGACY_QUERYPARSER"))
 
 
 def c(s):
@@ -51,34 +65,39 @@ class ParseError(ValueError):
 
 class FieldTerm(object):
     def __init__(self, field):
-        self.field = field
+        # Field names end up as keys in the DSL of every term; share a single string object
+        self.field = sys.intern(field) if field else field
 
     @property
     def qfield(self):
         return self.field or "_all"
 
-    def __str__(self):
-        return str(self).encode('utf-8')
+
+_BANG_TABLE = str.maketrans({"!": "*"})
 
 
 class BaseTerm(FieldTerm):
     def __init__(self, text, field):
         super(BaseTerm, self).__init__(field=field)
-        self.text = text.replace("!", "*")
+        # ! is an alias for the * wildcard; most terms contain neither
+        self.text = text.translate(_BANG_TABLE) if "!" in text else text
 
     def get_filter_dsl(self):
         return query_filter(self.get_dsl())
 
 
 class Term(BaseTerm):
+    def __init__(self, text, field):
+        super(Term, self).__init__(text, field)
+        self._qtype = "wildcard" if ('*' in self.text or '?' in self.text) else "match"
+
     def __str__(self):
-        return "{self.qfield}::{self.text}".format(**locals())
+        return self.qfield + "::" + self.text
 
     def get_dsl(self):
         if self.text == "*":
             return {"constant_score": {"filter": {"match_all": {}}}}
-        qtype = "wildcard" if ('*' in self.text or '?' in self.text) else "match"
-        return {qtype: {self.qfield: self.text.lower()}}
+        return {self._qtype: {self.qfield: self.text.lower()}}
 
     def get_filter_dsl(self):
         if "?" in self.text:
@@ -96,12 +115,15 @@ class Term(BaseTerm):
 
 class Quote(BaseTerm):
     def __str__(self):
-        return '{self.qfield}::QUOTE[{self.text}]'.format(**locals())
+        return self.qfield + "::QUOTE[" + self.text + "]"
 
     def get_dsl(self):
         return {"match_phrase": {self.qfield: self.text}}
 
 
+_BOOL_OPERATORS = {"OR": "should", "AND": "must", "NOT": "must_not"}
+
+
 class Boolean(object):
     def __init__(self, operator, terms, implicit=False):
         self.operator = operator
@@ -109,8 +131,7 @@ class Boolean(object):
         self.implicit = implicit
 
     def __str__(self):
-        terms = " ".join(str(t) for t in self.terms)
-        return '{self.operator}[{terms}]'.format(**locals())
+        return self.operator + "[" + " ".join(map(str, self.terms)) + "]"
 
     def _get_not_dsl(self, func="get_dsl"):
         if len(self.terms) == 1:
@@ -132,7 +153,7 @@ class Boolean(object):
         if self.operator == "NOT":
             return self._get_not_dsl("get_dsl")
         else:
-            op = dict(OR="should", AND="must", NOT="must_not")[self.operator]
+            op = _BOOL_OPERATORS[self.operator]
             return {"bool": {op: [term.get_dsl() for term in self.terms]}}
 
     def get_filter_dsl(self):
@@ -152,7 +173,7 @@ class Boolean(object):
         if self.operator == "NOT":
             return self._get_not_dsl("get_filter_dsl")
         else:
-            op = dict(OR="should", AND="must", NOT="must_not")[self.operator]
+            op = _BOOL_OPERATORS[self.operator]
             return {"bool": {op: [term.get_filter_dsl() for term in self.terms]}}
 
 
@@ -172,14 +193,14 @@ def _check_span(terms, field=None, allow_boolean=True):
             fld = _check_span(term.terms, allow_boolean=False)
         else:
             raise ParseError(
-                "Proximity queries cannot contain: {term!r} (allow_boolean={allow_boolean})".format(**locals()))
+                "Proximity queries cannot contain: {!r} (allow_boolean={})".format(term, allow_boolean))
 
         if fld:
             if not f:
                 f = fld
             elif f != fld:
-                raise ParseError("Proximity queries should refer to a unique field, found {f!r} and {fld!r}"
-                                 .format(**locals()))
+                raise ParseError("Proximity queries should refer to a unique field, found {!r} and {!r}"
+                                 .format(f, fld))
     return f
 
 
@@ -191,9 +212,8 @@ class Span(Boolean, FieldTerm):
         self.in_order = in_order
 
     def __str__(self):
-        terms = " ".join(str(t) for t in self.terms)
-        terms = terms.replace("_all::", "")
-        return '{self.qfield}::PROX/{self.slop}[{terms}]'.format(**locals())
+        terms = " ".join(map(str, self.terms)).replace("_all::", "")
+        return "{}::PROX/{}[{}]".format(self.qfield, self.slop, terms)
 
     def get_dsl(self):
         # we cannot directly use disjunctions in a span query, but we can put the disjunction outside the span
@@ -216,13 +236,26 @@ class Span(Boolean, FieldTerm):
                 return [get_clause(t, field)[0] for t in term.terms]
 
         clauses = [get_clause(t, self.qfield) for t in self.terms]
-        clauses = itertools.product(*clauses)
-        clauses = [{"span_near": {"slop": self.slop, "in_order": self.in_order, "clauses": list(c)}}
-                   for c in clauses]
-        if len(clauses) == 1:
-            return clauses[0]
+        disjunctions = [i for i, c in enumerate(clauses) if len(c) > 1]
+
+        if not disjunctions:
+            # Common case: no disjunctions, so a single span
+            return self._get_span_near([c[0] for c in clauses])
+
+        if len(disjunctions) == 1:
+            # Only one disjunction, so one span per alternative
+            i = disjunctions[0]
+            head = [c[0] for c in clauses[:i]]
+            tail = [c[0] for c in clauses[i+1:]]
+            spans = [self._get_span_near(head + [c] + tail) for c in clauses[i]]
         else:
-            return {"bool": {"should": clauses}}
+            # The product tuples are serialised as JSON arrays, so there is no need to copy them to lists
+            spans = [self._get_span_near(c) for c in itertools.product(*clauses)]
+
+        return {"bool": {"should": spans}}
+
+    def _get_span_near(self, clauses):
+        return {"span_near": {"slop": self.slop, "in_order": self.in_order, "clauses": clauses}}
 
     def get_filter_dsl(self):
         return query_filter(self.get_dsl())
@@ -230,26 +263,43 @@ class Span(Boolean, FieldTerm):
 
 def lucene_span(quote, field, slop):
     """Create a span query from a lucene style string, i.e. "terms"~10"""
-    clause = parse_to_terms(quote, simplify_terms=False)
+    # Span() modifies the terms it is given, so bypass the parse cache
+    clause = parse_to_terms.__wrapped__(quote, simplify_terms=False)
     if not (isinstance(clause, Boolean) and clause.operator == "OR" and clause.implicit):
-        raise ParseError("Lucene-style proximity queries must contain a list of terms, not {clause!r}"
-                         .format(**locals()))
+        raise ParseError("Lucene-style proximity queries must contain a list of terms, not {!r}"
+                         .format(clause))
     return Span(clause.terms, slop, field)
 
 
-def get_term(tokens, default_fieldname=None):
-    if 'slop' in tokens:
-        return lucene_span(tokens.quote, tokens.field, tokens.slop)
-    elif 'quote' in tokens:
+def build_term(field, term=None, quote=None, slop=None, default_fieldname=None):
+    if slop is not None:
+        return lucene_span(quote, field, slop)
+    elif quote is not None:
         # this is where it gets weird: phrase queries don't support general
         # prefixes, but span (=slop) queries do. So, make a span query
         # with slop=0 and in_order=True if a non-final wildcard is present
-        if "*" in tokens.quote or "?" in tokens.quote:
-            return lucene_span(tokens.quote, tokens.field, 0)
+        if "*" in quote or "?" in quote:
+            return lucene_span(quote, field, 0)
         else:
-            return Quote(tokens.quote, tokens.field)
+            return Quote(quote, field)
     else:
-        return Term(tokens.term, tokens.field or default_fieldname)
+        return Term(term, field or default_fieldname)
+
+
+def build_boolean(op, terms, slop=None):
+    if op == 'W/':
+        # create span query
+        return Span(terms, slop)
+    else:
+        implicit = op.startswith("implicit_")
+        if implicit: op = op.replace("implicit_", "")
+        return Boolean(op, terms, implicit)
+
+
+def get_term(tokens, default_fieldname=None):
+    quote = tokens.quote if 'quote' in tokens else None
+    slop = tokens.slop if 'slop' in tokens else None
+    return build_term(tokens.field, tokens.term, quote, slop, default_fieldname)
 
 
 def get_boolean_or_term(tokens):
@@ -257,15 +307,182 @@ def get_boolean_or_term(tokens):
     if isinstance(token, (Boolean, BaseTerm)):
         return token
     else:
-        op = token['operator']
         terms = [t for t in token if isinstance(t, (Boolean, BaseTerm))]
-        if op == 'W/':
-            # create span query
-            return Span(terms, token['slop'])
-        else:
-            implicit = op.startswith("implicit_")
-            if implicit: op = op.replace("implicit_", "")
-            return Boolean(op, terms, implicit)
+        return build_boolean(token['operator'], terms, token.get('slop'))
+
+
+class QuerySyntaxError(ParseError):
+    def __init__(self, msg, loc):
+        super(QuerySyntaxError, self).__init__("{msg} (at char {loc})".format(msg=msg, loc=loc))
+        self.loc = loc
+
+
+# Characters which cannot be part of a term (besides whitespace)
+_STOP_CHARS = frozenset('":()~')
+
+# Tokens are scanned with (C level) regular expressions rather than character loops
+_WHITESPACE_RE = re.compile(r'\s*')
+_FIELD_RE = re.compile(r'[a-zA-Z]+')
+_DIGITS_RE = re.compile(r'[0-9]+')
+_TERM_RE = re.compile(r'[^\s":()~]+')
+
+
+class QueryParser(object):
+    """
+    Recursive descent parser for the query language, producing the same Term, Quote,
+    Boolean and Span trees as the pyparsing grammar (see get_grammar), but considerably
+    faster. The grammar is:
+
+        binary := not (operator? not)*     (operator is AND, OR, NOT or W/n; default OR)
+        not    := NOT not | atom
+        atom   := "(" binary ")" | (field ":")? (quote ("~" slop)? | term)
+
+    All binary operators have the same precedence and are left associative: consecutive
+    operators of the same kind are collected in a single Boolean. Unlike the pyparsing
+    grammar, operators are only recognised as whole words, and unary NOT can be used as
+    an operand of a binary operator (a AND NOT b). As in the pyparsing grammar, the slop
+    of W/n need not be followed by whitespace (a W/5b is a W/5 b), and a trailing
+    operator (a NOT, a AND) is a syntax error.
+    """
+    def __init__(self, s, default_fieldname=None):
+        self.s = s
+        self.i = 0
+        self.default_fieldname = default_fieldname
+
+    def parse(self):
+        term = self._parse_binary()
+        self._skip()
+        if self.i != len(self.s):
+            raise self._error("Expected end of text")
+        return term
+
+    def _error(self, msg):
+        return QuerySyntaxError(msg, self.i)
+
+    def _skip(self):
+        self.i = _WHITESPACE_RE.match(self.s, self.i).end()
+
+    def _is_boundary(self, i):
+        return i >= len(self.s) or self.s[i].isspace() or self.s[i] in _STOP_CHARS
+
+    def _parse_operator(self):
+        """Parse a binary operator, and return a tuple (operator, slop)"""
+        self._skip()
+        s, i = self.s, self.i
+
+        for op in ("AND", "OR", "NOT"):
+            if s.startswith(op, i) and self._is_boundary(i + len(op)):
+                self.i = i + len(op)
+                return op, None
+
+        if s.startswith("W/", i):
+            self.i = i + 2
+            self._skip()
+            slop = self._parse_digits()
+            if slop is not None:
+                return "W/", slop
+            self.i = i
+
+        return "implicit_OR", None
+
+    def _parse_binary(self):
+        terms = [self._parse_not()]
+        kind, op, slop = None, None, None
+
+        while True:
+            start = self.i
+            next_op, next_slop = self._parse_operator()
+            try:
+                term = self._parse_not()
+            except QuerySyntaxError:
+                self.i = start
+                break
+
+            next_kind = "OR" if next_op == "implicit_OR" else next_op
+            if kind is not None and kind != next_kind:
+                # Operator changed, so (left associative) the terms so far form the first operand
+                terms = [build_boolean(op, terms, slop)]
+            kind, op, slop = next_kind, next_op, next_slop
+            terms.append(term)
+
+        if op is None:
+            return terms[0]
+        return build_boolean(op, terms, slop)
+
+    def _parse_not(self):
+        self._skip()
+        start = self.i
+        if self.s.startswith("NOT", start) and self._is_boundary(start + 3):
+            self.i = start + 3
+            try:
+                return Boolean("NOT", [self._parse_not()])
+            except QuerySyntaxError:
+                # Not followed by a term, so 'NOT' is the term itself
+                self.i = start
+        return self._parse_atom()
+
+    def _parse_atom(self):
+        self._skip()
+        if self.s.startswith("(", self.i):
+            self.i += 1
+            term = self._parse_binary()
+            self._skip()
+            if not self.s.startswith(")", self.i):
+                raise self._error('Expected ")"')
+            self.i += 1
+            return term
+        return self._parse_term()
+
+    def _parse_digits(self):
+        m = _DIGITS_RE.match(self.s, self.i)
+        if m is None:
+            return None
+        self.i = m.end()
+        return m.group()
+
+    def _parse_term(self):
+        s = self.s
+        field = None
+
+        # Optional field name: ascii letters followed by a colon
+        start = self.i
+        m = _FIELD_RE.match(s, start)
+        if m is not None:
+            self.i = m.end()
+            self._skip()
+            if s.startswith(":", self.i):
+                field = m.group()
+                self.i += 1
+                self._skip()
+            else:
+                self.i = start
+
+        i = self.i
+        if s.startswith('"', i):
+            end = s.find('"', i + 1)
+            quote = s[i + 1:end]
+            if end == -1 or "\n" in quote or "\r" in quote:
+                raise self._error("Expected closing quote")
+            self.i = end + 1
+
+            # Optional (lucene style) slop: "terms"~10
+            slop = None
+            before_slop = self.i
+            self._skip()
+            if s.startswith("~", self.i):
+                self.i += 1
+                self._skip()
+                slop = self._parse_digits()
+            if slop is None:
+                self.i = before_slop
+
+            return build_term(field, quote=quote, slop=slop)
+
+        m = _TERM_RE.match(s, i)
+        if m is None:
+            raise self._error("Expected term")
+        term, self.i = m.group(), m.end()
+        return build_term(field, term=term, default_fieldname=self.default_fieldname)
 
 
 def pprint(q, indent=0):
@@ -292,7 +509,7 @@ def _get_grammar(default_fieldname):
     @param default_fieldname:
     @return:
     """
-    from pyparsing import (Literal, Word, QuotedString, Optional, operatorPrecedence,
+    from pyparsing import (Literal, Word, Regex, QuotedString, Optional, operatorPrecedence,
                            nums, alphas, opAssoc)
 
     # literals
@@ -304,11 +521,9 @@ def _get_grammar(default_fieldname):
 
     COLON = Literal(":").suppress()
     TILDE = Literal("~").suppress()
-    LETTERS = ''.join(chr(c) for c in range(65536)
-                       if not chr(c).isspace() and chr(c) not in '":()~')
 
     # terms
-    term = Word(LETTERS)
+    term = Regex(r'[^\s":()~]+')
     slop = Word(nums).setResultsName("slop")
     quote = QuotedString('"').setResultsName("quote") + Optional(TILDE + slop)
     #quote.setParseAction(Quote)
@@ -325,8 +540,9 @@ def _get_grammar(default_fieldname):
     boolean_expr.setParseAction(get_boolean_or_term)
     return boolean_expr
 
-# Cache on startup
-get_grammar()
+if USE_LEGACY_PARSER:
+    # Cache on startup
+    get_grammar()
 
 def simplify(term):
     if isinstance(term, Boolean):
@@ -344,19 +560,27 @@ def simplify(term):
 class QueryParseError(ValueError):
     pass
 
+@functools.lru_cache(maxsize=512)
 def parse_to_terms(s, simplify_terms=True, default_fieldname=None, context=""):
+    """
+    Parse a query string to a tree of terms. Results are cached, so the returned terms
+    should not be modified. Use parse_to_terms.cache_clear() to empty the cache.
+    """
     s = strip_accents(s)
     if " *" in s.strip():
-        raise QueryParseError("Error in query '{context}': Can only use wildcard (*) as suffix or at beginning of query".format(**locals()))
+        raise QueryParseError("Error in query '{}': Can only use wildcard (*) as suffix or at beginning of query".format(context))
     try:
-        terms = get_grammar(default_fieldname).parseString(s, parseAll=True)[0]
-    except ParseException as e:
-        msg = "Error in query '{context}': {e}\n{s}".format(**locals())
+        if USE_LEGACY_PARSER:
+            terms = get_grammar(default_fieldname).parseString(s, parseAll=True)[0]
+        else:
+            terms = QueryParser(s, default_fieldname).parse()
+    except (ParseException, QuerySyntaxError) as e:
+        msg = "Error in query '{}': {}\n{}".format(context, e, s)
         if hasattr(e, "loc"):
             msg += "\n{space}^".format(space=" "*e.loc)
         raise QueryParseError(msg) 
     except Exception as e:
-        raise QueryParseError("Error parsing query '{context}': {e.__class__.__name__}: {e}\n{s}".format(**locals()))
+        raise QueryParseError("Error parsing query '{}': {}: {}\n{}".format(context, e.__class__.__name__, e, s))
     if simplify_terms:
         terms = simplify(terms)
     return terms
@@ -64,6 +64,17 @@ def get_or_create_sentences(article):
     return article.sentences.all()
 
 
+def get_or_create_sentences_bulk(articles):
+    """
+    Like get_or_create_sentences, but for multiple articles: split all given articles
+    which are not yet split, and save their sentences using a single bulk insert.
+    """
+    articles = {a.id: a for a in articles}
+    done = set(Sentence.objects.filter(article_id__in=articles).values_list("article_id", flat=True).distinct())
+    sents = [s for aid, a in articles.items() if aid not in done for s in _create_sentences(a)]
+    Sentence.objects.bulk_create(sents, batch_size=1000)
+
+
 def _get_paragraphs(article: Article):
     # Title
     yield article.title
@@ -1,5 +1,7 @@
 from amcat.tools import amcattest
-from amcat.tools.queryparser import parse_to_terms, QueryParseError, parse
+from pyparsing import ParseException
+
+from amcat.tools.queryparser import parse_to_terms, QueryParseError, parse, QueryParser, get_grammar, ParseError
 
 
 class TestQueryParser(amcattest.AmCATTestCase):
@@ -79,3 +81,84 @@ class TestQueryParser(amcattest.AmCATTestCase):
         ]}}
 
         self.assertEqual(q('a W/10 (b c)'), expected)
+
+    def test_operators(self):
+        q = lambda s: str(parse_to_terms(s))
+
+        # Mixed operators are left associative
+        self.assertEqual(q('a AND b OR c'), 'OR[AND[_all::a _all::b] _all::c]')
+        self.assertEqual(q('a AND b c'), 'OR[AND[_all::a _all::b] _all::c]')
+
+        # Unary NOT can be used as an operand
+        self.assertEqual(q('a AND NOT b'), 'AND[_all::a NOT[_all::b]]')
+        self.assertEqual(q('NOT a AND b'), 'AND[NOT[_all::a] _all::b]')
+        self.assertEqual(q('NOT NOT a'), 'NOT[NOT[_all::a]]')
+
+        # Nested operators of the same kind are flattened
+        self.assertEqual(q('a AND b AND c AND d'), 'AND[_all::a _all::b _all::c _all::d]')
+        self.assertEqual(q('(a AND b) AND (c AND d)'), 'AND[_all::a _all::b _all::c _all::d]')
+        self.assertEqual(q('(a OR b) (c OR d)'), 'OR[_all::a _all::b _all::c _all::d]')
+
+        # Operators are only recognised as whole words
+        self.assertEqual(q('a ANDROID'), 'OR[_all::a _all::ANDROID]')
+        self.assertEqual(q('NOTHING'), '_all::NOTHING')
+        self.assertEqual(q('AND'), '_all::AND')
+
+        self.assertRaises(QueryParseError, q, 'a OR')
+        self.assertRaises(QueryParseError, q, '(a b')
+        self.assertRaises(QueryParseError, q, '"a b')
+        self.assertRaises(QueryParseError, q, 'x:')
+
+    def test_cache(self):
+        self.assertIs(parse_to_terms("a AND b"), parse_to_terms("a AND b"))
+        self.assertIsNot(parse("a AND b"), parse("a AND b"))
+
+        # Lucene style span queries modify the parsed terms; they should not end up in the cache
+        self.assertRaises(QueryParseError, parse_to_terms, 'x:"a y:b"~5')
+        self.assertRaises(QueryParseError, parse_to_terms, 'x:"a y:b"~5')
+        self.assertEqual(str(parse_to_terms('y:b')), 'y::b')
+
+    def test_legacy_parser(self):
+        """QueryParser should yield the same terms as the pyparsing grammar"""
+        queries = ['a', 'a b', 'a OR b', 'a AND b', 'a NOT b NOT c', 'NOT a', 'NOT (a OR b)',
+                   'x:a AND y:"b c"', '"a b"~5 c', 'x : "a (b c)"~5', '"a* b"', '* NOT a',
+                   '(a b) W/10 c', 'a W/ 5 b W/5 c', '((a AND b) c)', 'a? OR b!', 'héllo wörld',
+                   '(a OR b) AND c', 'a AND (b W/5 c)', '(a W/5 b) OR c', '(a AND b) OR (c NOT d)',
+                   'x:a OR (y:b AND c)', 'a W/5b', 'a W/b']
+
+        for s in queries:
+            for default_fieldname in (None, "text"):
+                legacy = get_grammar(default_fieldname).parseString(s, parseAll=True)[0]
+                self.assertEqual(str(QueryParser(s, default_fieldname).parse()), str(legacy))
+
+        # Both reject invalid queries
+        for s in ['a OR', 'a W/5', 'a NOT', 'a NOT b NOT', 'title:(a OR b)']:
+            self.assertRaises(ParseError, QueryParser(s).parse)
+            self.assertRaises(ParseException, get_grammar(None).parseString, s, parseAll=True)
+            self.assertRaises(QueryParseError, parse_to_terms, s)
+
+        # The slop of W/n does not need to be followed by whitespace
+        self.assertEqual(str(QueryParser('a W/5b').parse()), '_all::PROX/5[a b]')
+
+    def test_legacy_parser_differences(self):
+        """QueryParser deliberately deviates from the pyparsing grammar, which drops terms and operators here"""
+        q = lambda s: str(QueryParser(s).parse())
+        legacy = lambda s: str(get_grammar(None).parseString(s, parseAll=True)[0])
+
+        expected = {
+            # Mixed operators without parentheses are left associative
+            'a OR b AND c': 'AND[OR[_all::a _all::b] _all::c]',
+            'a W/5 b AND c': 'AND[_all::PROX/5[a b] _all::c]',
+            'a W/5 b OR c': 'OR[_all::PROX/5[a b] _all::c]',
+            'a AND b OR c NOT d': 'NOT[OR[AND[_all::a _all::b] _all::c] _all::d]',
+            'x:a OR b AND y:c': 'AND[OR[x::a _all::b] y::c]',
+            # Operators are only recognised as whole words
+            'a ANDROID': 'OR[_all::a _all::ANDROID]',
+            # Unary NOT is nested as an operand
+            'a AND NOT b': 'AND[_all::a NOT[_all::b]]',
+            'NOT a OR b': 'OR[NOT[_all::a] _all::b]',
+        }
+
+        for s, terms in expected.items():
+            self.assertEqual(q(s), terms)
+            self.assertNotEqual(legacy(s), terms)
@@ -1,6 +1,6 @@
 from amcat.models import Sentence
 from amcat.tools import amcattest
-from amcat.tools.sbd import split, create_sentences
+from amcat.tools.sbd import split, create_sentences, get_or_create_sentences_bulk
 
 
 class TestSBD(amcattest.AmCATTestCase):
@@ -23,4 +23,15 @@ class TestSBD(amcattest.AmCATTestCase):
         self.assertEqual(sents, {(1, 1, hl),
                                  (2, 1, "A sentence"),
                                  (3, 1, "Another sentence"),
-                                 (3, 2, "And yet a third")})
\ No newline at end of file
+                                 (3, 2, "And yet a third")})
+
+    def test_get_or_create_sentences_bulk(self):
+        a1 = amcattest.create_test_article(title="Title one", text="A sentence. Another")
+        a2 = amcattest.create_test_article(title="Title two", text="Third sentence")
+        create_sentences(a1)
+
+        with self.checkMaxQueries(2):
+            get_or_create_sentences_bulk([a1, a2, a2])
+
+        self.assertEqual(Sentence.objects.filter(article=a1).count(), 3)
+        self.assertEqual(Sentence.objects.filter(article=a2).count(), 2)
@@ -28,6 +28,8 @@ from rest_framework.relations import ManyRelatedField
 from amcat.models import Project
 import logging
 
+log = logging.getLogger(__name__)
+
 class AmCATModelSerializer(serializers.ModelSerializer):
     def get_fields(self):
         fields = super(AmCATModelSerializer, self).get_fields()
@@ -44,7 +46,7 @@ class AmCATProjectModelSerializer(AmCATModelSerializer):
     def project_id(self):
         project_id = self.context["view"].kwargs.get('project')
         if not project_id:
-            logging.warn("Could not find project in kwargs: {}".format(self.context["view"].kwargs))
+            log.warning("Could not find project in kwargs: %s", self.context["view"].kwargs)
         return project_id
                          
             
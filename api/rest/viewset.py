@@ -27,6 +27,7 @@ and multiple times for viewsets with the same model, but a different scope.
 
 __all__ = ("AmCATViewSetMixin", "get_url_pattern", "AmCATViewSetMixinTest")
 
+import functools
 from collections import OrderedDict, namedtuple
 from django.core.urlresolvers import reverse
 
@@ -61,14 +62,19 @@ class AmCATViewSetMixin(object):
             assert self.queryset.model == self.model, "self.model ({self.model}) != self.queryset.model ({self.queryset.model})".format(**locals())
 
     def __getattr__(self, item):
-        checked = []
-        for model_key, viewset in self._get_model_keys():
-            checked.append(model_key)
-            if model_key is item:
-                return viewset.queryset.model.objects.get(pk=self.kwargs.get(model_key, self.kwargs.get("pk")))
-        raise AttributeError("Cannot find attribute {item} in keys {checked}".format(**locals()))
+        model_keys = self._get_model_key_map()
+        viewset = model_keys.get(item)
+        if viewset is None:
+            checked = list(model_keys)
+            raise AttributeError("Cannot find attribute {item} in keys {checked}".format(**locals()))
+
+        obj = viewset.queryset.model.objects.get(pk=self.kwargs.get(item, self.kwargs.get("pk")))
+        # Store on the instance, so __getattr__ is not called again for this key
+        self.__dict__[item] = obj
+        return obj
 
     @classmethod
+    @functools.lru_cache()
     def get_url_pattern(cls):
         """
         Get an url pattern (ready to be inserted in urlpatterns()) for `viewset`.
@@ -87,6 +93,7 @@ class AmCATViewSetMixin(object):
 
         
     @classmethod
+    @functools.lru_cache()
     def get_default_basename(cls):
         model_keys = list(mk.key for mk in cls._get_model_keys())
         return "-".join(model_keys[:-1])
@@ -96,35 +103,55 @@ class AmCATViewSetMixin(object):
         return getattr(cls, "base_name", cls.get_default_basename())
 
     def finalize_response(self, request, response, *args, **kargs):
-        if isinstance(request.data, dict):
-            format = request.query_params.get("format", request.data.get("format", "api"))
-            filename = request.query_params.get("filename", request.data.get("filename", "data"))
-        else:
-            format = "api"
-            filename = "data"
         response = super(AmCATViewSetMixin, self).finalize_response(request, response, *args, **kargs)
-        response = tablerenderer.set_response_content(response, format, filename)
-        return response
+
+        data = request.data
+        if not isinstance(data, dict):
+            return response
+
+        params = request.query_params
+        format = params.get("format", data.get("format", "api"))
+        if format not in tablerenderer.FORMAT_RENDERER_MAP:
+            # Not a table download, so no headers to set
+            return response
+
+        filename = params.get("filename", data.get("filename", "data"))
+        return tablerenderer.set_response_content(response, format, filename)
     
-    @classmethod    
+    @classmethod
+    @functools.lru_cache()
     def _get_model_keys(cls):
         """
-        Get an iterator of all model_key properties in superclasses. This function
-        yields an ordered list, working up the inheritance tree according to Pythons
-        MRO algorithm.
+        Get a tuple of all model_key properties in superclasses. This function
+        returns an ordered list, working up the inheritance tree according to Pythons
+        MRO algorithm. The result is cached per class.
 
-        @rtype: ModelKey
+        @rtype: tuple of ModelKey
         """
         model_key = getattr(cls, "model_key", None)
         if model_key is None:
-            return
+            return ()
 
+        model_keys = []
         for base in cls.__bases__:
             if not hasattr(base, '_get_model_keys'): continue
-            for basekey in base._get_model_keys():
-                yield basekey
+            model_keys.extend(base._get_model_keys())
 
-        yield ModelKey(model_key, cls)
+        model_keys.append(ModelKey(model_key, cls))
+        return tuple(model_keys)
+
+    @classmethod
+    @functools.lru_cache()
+    def _get_model_key_map(cls):
+        """
+        Get an ordered mapping of model_key to the (first) viewset defining it.
+
+        @rtype: OrderedDict
+        """
+        model_keys = OrderedDict()
+        for model_key, viewset in cls._get_model_keys():
+            model_keys.setdefault(model_key, viewset)
+        return model_keys
 
     @classmethod
     def _get_url_pattern_listname(cls):
@@ -140,7 +167,7 @@ class AmCATViewSetMixin(object):
             yield r"{model_key}s/(?P<{model_key}>\d+)".format(**locals())
         yield r"{model_key}s".format(model_key=model_keys[-1])
 
-_RE_UUID = "[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+_RE_UUID = re.compile("[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.I)
 class UUIDLookupMixin(object):
     """
     Allow alternative lookup by uuid instead of pk
@@ -154,7 +181,7 @@ class UUIDLookupMixin(object):
         except Http404:
             # does the PK look like a uuid?
             pk = self.kwargs['pk']
-            if re.match(_RE_UUID, pk.lower()):
+            if len(pk) == 36 and _RE_UUID.fullmatch(pk):
                 queryset = self.filter_queryset(self.get_queryset())
                 obj = get_object_or_404(queryset, **{self.uuid_lookup_field: pk})
                 self.check_object_permissions(self.request, obj)
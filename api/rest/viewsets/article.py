@@ -38,9 +38,9 @@ POST requests return only the ids of the created articles
 #     but I think we should clean it up once we deal with parents (issue #460)
 import datetime
 import logging
-import re
 from typing import List, Dict, Any, Union
 
+from django.db.models import Q
 from django.forms import ModelChoiceField
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
@@ -59,7 +59,6 @@ from api.rest.viewsets.articleset import ArticleSetViewSetMixin
 from api.rest.viewsets.project import CannotEditLinkedResource, NotFoundInProject
 from api.rest.viewsets.project import ProjectViewSetMixin
 
-re_uuid = re.compile("[0-F]{8}-[0-F]{4}-[0-F]{4}-[0-F]{4}-[0-F]{12}", re.I)
 log = logging.getLogger(__name__)
 
 __all__ = ("ArticleSerializer", "ArticleViewSet")
@@ -107,13 +106,9 @@ class ArticleListSerializer(serializers.ListSerializer):
         return super(ArticleListSerializer, self).to_internal_value(articles)
 
     def create(self, validated_data):
-        # Get articleset object given through URL
-        articleset_id = self.context["view"].kwargs.get('articleset')
-        if articleset_id is not None:
-            articleset = ArticleSet.objects.get(pk=articleset_id)
-            project = articleset.project
-        else:
-            raise ValueError("Missing articleset parameter?")
+        # The view has already fetched (and checked) the set given through the URL
+        articleset = self.context["view"].articleset
+        project = articleset.project
 
         # Create articles not yet in database
         new_articles = [a for a in validated_data if "id" not in a]
@@ -133,10 +128,8 @@ class ArticleSerializer(AmCATProjectModelSerializer):
     project = ModelChoiceField(queryset=Project.objects.all(), required=True)
 
     def get_articleset(self):
-        articleset_id = self.context["view"].kwargs.get('articleset')
-        if articleset_id is not None:
-            return ArticleSet.objects.get(pk=articleset_id)
-        raise ValueError("Missing articleset parameter?")
+        # The view has already fetched (and checked) the set, and caches it for this request
+        return self.context["view"].articleset
 
     def to_internal_value(self, data):
         # Get articleset object given through URL
@@ -160,7 +153,8 @@ class ArticleSerializer(AmCATProjectModelSerializer):
 
         if 'id' in validated_data:
             _check_read_access(self.context['request'].user, [validated_data['id']])
-            article = Article.objects.get(pk=validated_data['id'])
+            # Only the id is serialised in POST responses
+            article = Article.objects.only("pk").get(pk=validated_data['id'])
             articleset.add_articles([article])
         else:
             article = json_to_article(validated_data, articleset.project)
@@ -186,42 +180,57 @@ class ArticleSerializer(AmCATProjectModelSerializer):
 
 
 class SmartParentFilter(MappingOrderingFilter):
+    order_parent = False
+
     def get_ordering(self, request, queryset, view):
         ordering = super(SmartParentFilter, self).get_ordering(request, queryset, view)
-        if ordering and "parent" in ordering:
+        # Remember whether parent ordering was requested, so filter_queryset need not determine the ordering again
+        self.order_parent = bool(ordering) and "parent" in ordering
+        if self.order_parent:
             ordering.remove("parent")
         return ordering
 
-    def order_parent(self, request, queryset, view):
-        ordering = super(SmartParentFilter, self).get_ordering(request, queryset, view)
-        return ordering and "parent" in ordering
-
     def filter_queryset(self, request, queryset, view):
         result = super(SmartParentFilter, self).filter_queryset(request, queryset, view)
 
-        if self.order_parent(request, queryset, view):
-            result = list(result.only("id", "parent"))
+        if self.order_parent:
+            result = list(result.only("id", "hash", "parent_hash"))
             result = list(parents_first_order(result))
 
         return result
 
 
 def parents_first_order(articles):
-    """Reorder articles such that parent comes before children (if parent is present)"""
-    all_ids = {a.id for a in articles}
-    seen = set()
-    todo = articles
-    while todo:
-        new_todo = []
-        for a in todo:
-            if a.parent_id and a.parent_id in all_ids and a.parent_id not in seen:
-                new_todo.append(a)
-            else:
-                seen.add(a.id)
-                yield a
-        if len(new_todo) >= len(todo):
-            raise ValueError("Cyclical parent ordering!")
-        todo = new_todo
+    """
+    Reorder articles such that parent comes before children (if parent is present)
+
+    The result is the same as repeatedly passing over the articles in their given order, each
+    time taking every article whose parent is absent or already taken, but is computed by
+    determining the pass in which each article would be taken, following each parent chain once.
+    """
+    articles = list(articles)
+    positions = {a.hash: i for i, a in enumerate(articles)}
+    parents = [positions.get(a.parent_hash) if a.parent_hash else None for a in articles]
+
+    passes = [None] * len(articles)
+    for i in range(len(articles)):
+        # Walk up to the first ancestor whose pass is known (or the root)
+        chain, on_chain = [], set()
+        j = i
+        while j is not None and passes[j] is None:
+            if j in on_chain:
+                raise ValueError("Cyclical parent ordering!")
+            chain.append(j)
+            on_chain.add(j)
+            j = parents[j]
+
+        # A child is taken in the same pass as its parent if it comes after it, otherwise in the next
+        for k in reversed(chain):
+            parent = parents[k]
+            passes[k] = 1 if parent is None else passes[parent] + (parent > k)
+
+    for i in sorted(range(len(articles)), key=lambda i: (passes[i], i)):
+        yield articles[i]
 
 
 class ArticleViewSet(ProjectViewSetMixin, ArticleSetViewSetMixin, ArticleViewSetMixin,
@@ -235,22 +244,23 @@ class ArticleViewSet(ProjectViewSetMixin, ArticleSetViewSetMixin, ArticleViewSet
     filter_backends = (SmartParentFilter,)
 
     def check_permissions(self, request):
-        # make sure that the requested set is available in the projec, raise 404 otherwiset
-        # sets linked_set to indicate whether the current set is owned by the project
-        if self.articleset.project_id == self.project.id:
-            pass
-        elif self.project.articlesets.filter(pk=self.articleset.id).exists():
-            if request.method == 'POST':
-                raise CannotEditLinkedResource()
-        else:
-            raise NotFoundInProject()
+        # make sure that the requested set is available in the project (raises 404 otherwise)
+        # and that linked sets, which are not owned by the project, are not edited
+        if self.articleset.project_id != int(self.kwargs['project']) and request.method == 'POST':
+            raise CannotEditLinkedResource()
         return super(ArticleViewSet, self).check_permissions(request)
 
     @property
     @cached
     def articleset(self):
+        """The requested set, if it is owned by or linked to the requested project"""
         articleset_id = int(self.kwargs['articleset'])
-        return ArticleSet.objects.get(pk=articleset_id)
+        project_id = int(self.kwargs['project'])
+        articlesets = ArticleSet.objects.filter(Q(project_id=project_id) | Q(projects_set=project_id))
+        try:
+            return articlesets.select_related("project").distinct().get(pk=articleset_id)
+        except ArticleSet.DoesNotExist:
+            raise NotFoundInProject()
 
     @property
     def text(self):
@@ -53,13 +53,18 @@ class CodedArticleSerializer(AmCATModelSerializer):
     get_length = article_property("length_int")
     get_article_id = article_property("id")
 
-    def _get_coded_articles(self):
+    def _get_article_ids(self):
+        coded_articles = getattr(self.parent, "instance", None)
+        if coded_articles is not None:
+            # Serialising a (paginated) list, so only fetch the articles on this page
+            return [ca.article_id for ca in coded_articles]
         view = self.context["view"]
-        return CodedArticle.objects.filter(id__in=view.filter_queryset(view.get_queryset()))
+        coded_articles = CodedArticle.objects.filter(id__in=view.filter_queryset(view.get_queryset()))
+        return coded_articles.values_list("article__id", flat=True)
 
     @cached
     def _get_articles(self):
-        aids = self._get_coded_articles().values_list("article__id", flat=True)
+        aids = self._get_article_ids()
         articles = Article.objects.filter(id__in=aids).only("id", "title", "date", "properties")
         return {a.id: a for a in articles}
 
@@ -99,7 +104,7 @@ class CodedArticleViewSet(ProjectViewSetMixin, CodingJobViewSetMixin,
 
     def filter_queryset(self, queryset):
         qs = super(CodedArticleViewSet, self).filter_queryset(queryset)
-        return qs.filter(id__in=self.codingjob.coded_articles.all())
+        return qs.filter(codingjob_id=self.codingjob.id)
 
 
 class CodedArticleSentenceViewSet(ProjectViewSetMixin, CodingJobViewSetMixin,
@@ -117,6 +122,8 @@ class CodedArticleSentenceViewSet(ProjectViewSetMixin, CodingJobViewSetMixin,
 
     def filter_queryset(self, queryset):
         qs = super(CodedArticleSentenceViewSet, self).filter_queryset(queryset)
-        article = Article.objects.get(id=self.coded_article.article_id)
-        sentences = qs.filter(id__in=sbd.get_or_create_sentences(article))
-        return sentences
+        article_id = self.coded_article.article_id
+        if not Sentence.objects.filter(article_id=article_id).exists():
+            # Only fetch the article (and its text) if it still needs to be split
+            sbd.create_sentences(Article.objects.get(id=article_id))
+        return qs.filter(article_id=article_id)
@@ -1,3 +1,8 @@
+import json
+
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
 from amcat.tools import amcattest
 from api.rest.viewsets import CodedArticleSerializer
 
@@ -43,3 +48,37 @@ class TestCodedArticleSerializer(amcattest.AmCATTestCase):
             s.get_title(ca3)
             s.get_date(ca3)
             s.get_pagenr(ca3)
+
+
+class TestCodedArticleViewSet(APITestCase):
+    def _get(self, url, **params):
+        response = self.client.get(url, dict(format="json", **params))
+        self.assertEqual(response.status_code, 200, response.content)
+        return json.loads(response.content.decode(response.charset))
+
+    @amcattest.use_elastic
+    def test_list_pages(self):
+        job = amcattest.create_test_job(15)
+        self.client.login(username=job.project.owner.username, password="test")
+        url = reverse("api:project-codingjob-coded_article-list",
+                      kwargs=dict(project=job.project.id, codingjob=job.id))
+
+        # Page size is 10, so the coded articles are spread over two pages
+        pages = [self._get(url, page=1), self._get(url, page=2)]
+        self.assertEqual([len(p["results"]) for p in pages], [10, 5])
+
+        coded_articles = {ca.id: ca.article for ca in job.coded_articles.all()}
+        results = [r for page in pages for r in page["results"]]
+        self.assertEqual({r["id"] for r in results}, set(coded_articles))
+        for r in results:
+            article = coded_articles[r["id"]]
+            self.assertEqual(r["article_id"], article.id)
+            self.assertEqual(r["title"], article.title)
+
+        # Sentences of a coded article on the second page
+        coded_article = pages[1]["results"][0]
+        url = reverse("api:project-codingjob-coded_article-sentence-list",
+                      kwargs=dict(project=job.project.id, codingjob=job.id, coded_article=coded_article["id"]))
+        sentences = self._get(url)["results"]
+        self.assertTrue(sentences)
+        self.assertEqual({s["article"] for s in sentences}, {coded_article["article_id"]})
@@ -77,7 +77,7 @@ class ProjectPermission(permissions.BasePermission):
 
         actual_role_id = view.project.get_role_id(user=user)
         if actual_role_id is None or actual_role_id < required_role_id:
-            log.warn("User {user} has role {actual_role_id} < {required_role_id}".format(**locals()))
+            log.warning("User %s has role %s < %s", user, actual_role_id, required_role_id)
 
         if actual_role_id is None:
             return False
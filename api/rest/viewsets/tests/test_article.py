@@ -10,6 +10,7 @@ from amcat.tools import amcattest
 from amcat.tools import amcates
 from amcat.tools import toolkit
 from amcat.models import Article
+from api.rest.viewsets.article import parents_first_order
 
 
 def test_article(**kwargs):
@@ -30,13 +31,15 @@ class TestArticleViewSet(APITestCase):
         self.aset = amcattest.create_test_set(project=self.project)
         # self.url = reverse("api:article") + "?format=json"
 
-    def url_set(self, setid=None, projectid=None, text=False):
+    def url_set(self, setid=None, projectid=None, text=False, ordering=None):
         if setid is None: setid = self.aset.id
         if projectid is None: projectid = self.project.id
         url = reverse("api:project-articleset-article-list",
                       kwargs=dict(project=projectid, articleset=setid)) + "?format=json"
         if text:
             url += "&text=True"
+        if ordering:
+            url += "&ordering=" + ordering
         return url
 
     def url_article(self, aid, projectid=None, setid=None, text=False):
@@ -246,3 +249,42 @@ class TestArticleViewSet(APITestCase):
         # unless he gets read access to project 2
         ProjectRole.objects.create(project=p2, user=p4.owner, role=reader)
         self._post_articles([a1.id, a2.id], projectid=p4.id, setid=s4.id, as_user=p4.owner, expected_status=201)
+
+    @amcattest.use_elastic
+    def test_order_parent(self):
+        parent, child, grandchild = [amcattest.create_test_article(create=False, project=self.project)
+                                     for _ in range(3)]
+        parent.compute_hash()
+        child.parent_hash = parent.hash
+        child.compute_hash()
+        grandchild.parent_hash = child.hash
+        grandchild.compute_hash()
+
+        # Create the children first, so they do not come after their parent by id
+        for article in (grandchild, child, parent):
+            Article.create_articles([article], articleset=self.aset)
+        amcates.ES().refresh()
+
+        ids = [a["id"] for a in self._get_articles(ordering="parent")["results"]]
+        self.assertEqual(ids, [parent.id, child.id, grandchild.id])
+
+
+class TestParentsFirstOrder(amcattest.AmCATTestCase):
+    class A(object):
+        def __init__(self, id, parent_id=None):
+            self.id = id
+            self.hash = "h{}".format(id)
+            self.parent_hash = parent_id and "h{}".format(parent_id)
+
+    def test_order(self):
+        A = self.A
+        articles = [A(1, 3), A(2), A(3, 4), A(4), A(5, 99), A(6, 4)]
+        ids = [a.id for a in parents_first_order(articles)]
+        # Articles are taken in passes over the input order, children after their parents
+        self.assertEqual(ids, [2, 4, 5, 6, 3, 1])
+
+    def test_cycle(self):
+        A = self.A
+        articles = [A(1, 2), A(2, 1), A(3)]
+        self.assertRaises(ValueError, list, parents_first_order(articles))
+        self.assertRaises(ValueError, list, parents_first_order([A(1, 1)]))
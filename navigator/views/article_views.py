@@ -17,18 +17,21 @@
 # License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
 ###########################################################################
 import html
+from collections import deque
 from itertools import chain
 
 from django.views.generic.detail import DetailView
 from django.shortcuts import render
 from django.core.urlresolvers import reverse
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.template.defaultfilters import escape
 
 from navigator.views.articleset_views import ArticleSetDetailsView
 from amcat.models import Article, ArticleSet, Sentence
 from navigator.views.projectview import ProjectViewMixin, HierarchicalViewMixin, BreadCrumbMixin, ProjectFormView, ProjectActionRedirectView
-from amcat.tools import sbd
+from amcat.tools import amcates, sbd
+from amcat.tools.caching import cached
 from amcat.models import authorisation, Project, CodingJob
 from navigator.views.project_views import ProjectDetailsView
 import navigator.forms
@@ -112,13 +115,14 @@ class ArticleRemoveFromSetView(ProjectActionRedirectView):
     def action(self, **kwargs):
         remove_set = int(self.request.GET["remove_set"])
         # user needs to have writer+ on the project of the articleset
-        project = ArticleSet.objects.get(pk=remove_set).project
+        articleset = ArticleSet.objects.select_related("project").get(pk=remove_set)
+        project = articleset.project
         if not project.has_role(authorisation.ROLE_PROJECT_WRITER, self.request.user):
             raise PermissionDenied("User {self.request.user} has insufficient rights on project {project}".format(**locals()))
 
 
         articles = [int(kwargs["article"])]
-        ArticleSet.objects.get(pk=remove_set).remove_articles(articles)
+        articleset.remove_articles(articles)
 
 
     def get_redirect_url(self, project, article):
@@ -159,11 +163,13 @@ def get_articles(article, sentences):
     @raises: ValueError if a sentence in `sentences` is not in article.sentences
     """
     new_article = copy_article(article)
+    parts = []  # text of new_article, joined when it is yielded
 
-    # Get sentence, skipping the title
-    all_sentences = list(article.sentences.all()[1:])
+    # Get (id, parnr, sentnr, sentence) of all sentences, skipping the title
+    all_sentences = deque(article.sentences.values_list("id", "parnr", "sentnr", "sentence")[1:])
+    delimiters = list(sentences.values_list("id", "parnr", "sentnr"))
 
-    not_in_article = set(sentences) - set(all_sentences)
+    not_in_article = {d[0] for d in delimiters} - {s[0] for s in all_sentences}
     if not_in_article:
         raise ValueError(
             "Sentences specified as delimters, but not in article: {not_in_article}. Did you try to split on a title?"
@@ -171,74 +177,103 @@ def get_articles(article, sentences):
         )
 
     prev_parnr = 1
-    for parnr, sentnr in chain(sentences.values_list("parnr", "sentnr"), ((None, None),)):
+    for _, parnr, sentnr in chain(delimiters, ((None, None, None),)):
         # Skip title paragraph
         if parnr == 1: continue
 
         while True:
-            try: sent = all_sentences.pop(0)
+            try: _, sent_parnr, sent_sentnr, sentence = all_sentences.popleft()
             except IndexError:
-                new_article.text = new_article.text.strip()
+                new_article.text = "".join(parts).strip()
                 yield new_article
                 break
 
-            if sent.parnr != prev_parnr:
-                new_article.text += "\n\n"
+            if sent_parnr != prev_parnr:
+                parts.append("\n\n")
 
-            new_article.text += sent.sentence
-            new_article.text += ". "
-            prev_parnr = sent.parnr
+            parts.append(sentence)
+            parts.append(". ")
+            prev_parnr = sent_parnr
 
-            if (sent.sentnr == sentnr and sent.parnr == parnr):
-                new_article.text = new_article.text.strip()
+            if (sent_sentnr == sentnr and sent_parnr == parnr):
+                new_article.text = "".join(parts).strip()
                 yield new_article
                 new_article = copy_article(article)
+                parts = []
                 break
 
 
+def _index_split(article, articles, splitted_sets, remove_sets, add_sets):
+    """Bring the index in line with the changes committed by handle_split"""
+    es = amcates.ES()
+
+    splitted_set_ids = [aset.id for aset in splitted_sets]
+    new_articles = [a for a in articles if not a._duplicate]
+    es.bulk_insert([a.get_article_dict(sets=splitted_set_ids) for a in new_articles], batch_size=100)
+
+    duplicate_ids = {a.id for a in articles if a._duplicate}
+    properties = set(chain.from_iterable(a.properties.keys() for a in articles))
+    for aset in splitted_sets:
+        es.add_to_set(aset.id, duplicate_ids)
+        aset._add_to_property_cache(properties)
+
+    for aset in remove_sets:
+        es.remove_from_set(aset.id, [article.id])
+
+    for aset in add_sets:
+        es.add_to_set(aset.id, [article.id])
+
+    es.refresh()
+
+
 def handle_split(form, project, article, sentences):
+    """
+    Split article at the given sentences and update set memberships as specified by form.
+    The database is updated in a single transaction; as the index cannot be rolled back,
+    it is only updated once that transaction is committed.
+    """
     articles = list(get_articles(article, sentences))
 
-    # We won't use bulk_create yet, as it bypasses save() and doesn't
-    # insert ids
-    Article.create_articles(articles)
-    for art in articles:
-        sbd.get_or_create_sentences(art)
+    with transaction.atomic():
+        # We won't use bulk_create yet, as it bypasses save() and doesn't
+        # insert ids
+        Article.create_articles(articles, add_to_index=False)
+        sbd.get_or_create_sentences_bulk(articles)
 
-    if not form.is_valid():
-        raise ValueError("Form invalid: {form.errors}".format(**locals()))
+        if not form.is_valid():
+            raise ValueError("Form invalid: {form.errors}".format(**locals()))
 
-    # Context variables for template
-    form_data = form.cleaned_data
-    all_sets = list(project.all_articlesets().filter(articles=article))
+        # Context variables for template
+        form_data = form.cleaned_data
+        all_sets = list(project.all_articlesets().filter(articles=article))
 
-    # Add splitted articles to existing sets
-    for aset in form_data["add_splitted_to_sets"]:
-        aset.add_articles(articles)
+        # Add splitted articles to existing sets, and to sets wherin the original article live{d,s}.
+        # Sets selected for both are only updated once.
+        splitted_sets = set(form_data["add_splitted_to_sets"])
+        if form_data["add_splitted_to_all"]:
+            splitted_sets.update(all_sets)
 
-    # Add splitted articles to sets wherin the original article live{d,s}
-    if form_data["add_splitted_to_all"]:
-        asets = project.all_articlesets().filter(articles=article).only("id")
-        for aset in asets:
-            aset.add_articles(articles)
+        if form_data["add_splitted_to_new_set"]:
+            new_splitted_set = ArticleSet.create_set(project, form_data["add_splitted_to_new_set"])
+            splitted_sets.add(new_splitted_set)
 
-    if form_data["remove_from_sets"]:
-        for aset in form_data["remove_from_sets"]:
-            aset.remove_articles([article])
+        for aset in splitted_sets:
+            aset.add_articles(articles, add_to_index=False)
 
-    if form_data["remove_from_all_sets"]:
-        for aset in ArticleSet.objects.filter(project=project, articles=article).distinct():
-            aset.remove_articles([article])
+        remove_sets = set(form_data["remove_from_sets"] or ())
+        if form_data["remove_from_all_sets"]:
+            remove_sets.update(ArticleSet.objects.filter(project=project, articles=article).distinct())
+        ArticleSet.remove_articles_from_sets(remove_sets, [article], remove_from_index=False)
 
-    if form_data["add_splitted_to_new_set"]:
-        new_splitted_set = ArticleSet.create_set(project, form_data["add_splitted_to_new_set"], articles)
+        add_sets = set(form_data["add_to_sets"] or ())
+        if form_data["add_to_new_set"]:
+            new_set = ArticleSet.create_set(project, form_data["add_to_new_set"])
+            add_sets.add(new_set)
 
-    if form_data["add_to_sets"]:
-        for articleset in form_data["add_to_sets"]:
-            articleset.add_articles([article])
+        for aset in add_sets:
+            aset.add_articles([article], add_to_index=False)
 
-    if form_data["add_to_new_set"]:
-        new_set = ArticleSet.create_set(project, form_data["add_to_new_set"], [article])
+        transaction.on_commit(lambda: _index_split(article, articles, splitted_sets, remove_sets, add_sets))
 
     return locals()
 
@@ -267,19 +302,6 @@ def _get_sentences(sentences, prev_parnr=1):
         yield (sentence, prev_parnr != sentence.parnr)
         prev_parnr = sentence.parnr
 
-def parse_sentence_name(name):
-    if not name.startswith("sentence-"): return
-
-    try:
-        return int(name.split("-")[1])
-    except (IndexError, ValueError):
-        pass
-
-def get_sentence_ids(post):
-    for name, checked in post.items():
-        if checked != "on": continue
-        yield parse_sentence_name(name)
-
 class ArticleSplitView(ProjectFormView):
     parent = ProjectArticleDetailsView
     url_fragment = "split"
@@ -296,11 +318,13 @@ class ArticleSplitView(ProjectFormView):
         return form_class(data=self.request.POST, project=self.project, article=self.article)
 
     @property
+    @cached
     def article(self):
         return Article.objects.get(pk=self.kwargs['article'])
 
     def form_valid(self, form):
-        selected_sentence_ids = set(get_sentence_ids(self.request.POST)) - {None,}
+        # Selected sentences are posted as a list of ids under the "sentence" key
+        selected_sentence_ids = {int(sid) for sid in self.request.POST.getlist("sentence") if sid.isdigit()}
         if selected_sentence_ids:
             sentences = Sentence.objects.filter(id__in=selected_sentence_ids)
             context = handle_split(form, self.project, self.article, sentences)
@@ -310,8 +334,8 @@ class ArticleSplitView(ProjectFormView):
 
     def get_context_data(self, **kwargs):
         ctx = super(ArticleSplitView, self).get_context_data(**kwargs)
-        sentences = sbd.get_or_create_sentences(self.article).only("sentence", "parnr")
+        # Skip the title (paragraph 1) in the query itself; _get_sentences starts at paragraph 1
+        sentences = sbd.get_or_create_sentences(self.article).only("sentence", "parnr")[1:]
         ctx["sentences"] = _get_sentences(sentences)
-        next(ctx["sentences"]) # skip title
         return ctx
 
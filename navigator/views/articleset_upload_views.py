@@ -12,6 +12,7 @@ import itertools
 
 import functools
 from django import forms
+from django.core.files.move import file_move_safe
 from django.core.files.uploadedfile import UploadedFile
 from django.core.urlresolvers import reverse
 from django.http import QueryDict
@@ -23,6 +24,7 @@ from amcat.models import Plugin
 from amcat.scripts.article_upload import upload
 from amcat.scripts.article_upload.upload import REQUIRED, ArticleField
 from amcat.tools.amcates import is_valid_property_name, ARTICLE_FIELDS
+from amcat.tools.caching import cached
 from navigator.views.project_views import ProjectDetailsView
 from navigator.views.projectview import BaseMixin
 from navigator.views.scriptview import ScriptHandler, get_temporary_file_dict
@@ -94,8 +96,12 @@ class ArticleSetUploadView(BaseMixin, FormView):
         upload_dir = get_or_create_upload_dir(str(self.request.user.id), upload_id)
         file_path = os.path.join(upload_dir, file.name)
 
-        with open(file_path, "wb") as dst:
-            shutil.copyfileobj(file, dst)
+        if hasattr(file, "temporary_file_path"):
+            # Large uploads are already written to disk by Django, so move instead of copying them
+            file_move_safe(file.temporary_file_path(), file_path, allow_overwrite=True)
+        else:
+            with open(file_path, "wb") as dst:
+                shutil.copyfileobj(file, dst)
 
         session_key = "upload__{upload_id}".format(**locals())
         self.request.session[session_key] = {"project": self.project.id,
@@ -146,13 +152,11 @@ class ArticleUploadFieldForm(forms.Form):
 
 
 class ArticleUploadFormSet(forms.BaseFormSet):
-    management_initial = ()
-    project = None
-
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, project=None, management_initial=(), **kwargs):
         super().__init__(*args, **kwargs)
-        self.management_initial = dict(self.management_initial)
-        self.form_kwargs['project'] = self.project
+        self.project = project
+        self.management_initial = dict(management_initial)
+        self.form_kwargs['project'] = project
 
     @property
     def management_form(self):
@@ -169,17 +173,23 @@ class ArticleUploadFormSet(forms.BaseFormSet):
             raise forms.ValidationError("Missing required article field(s): {}".format(", ".join(required)))
 
 
+# Built once; per-request state (project, upload_id) is passed through get_form_kwargs
+ArticleUploadFieldFormSet = forms.formset_factory(ArticleUploadFieldForm, formset=ArticleUploadFormSet)
+
+
 class ArticlesetUploadOptionsView(BaseMixin, FormView):
+    form_class = ArticleUploadFieldFormSet
     parent = ProjectDetailsView
     view_name = "articleset-upload-options"
     url_fragment = "upload-options"
 
     @property
-    @functools.lru_cache()
+    @cached
     def script_fields(self) -> List[ArticleField]:
         return list(self.script_class.get_fields(self.upload['filename'], self.upload['encoding']))
 
     @property
+    @cached
     def upload_id(self):
         return UUID(bytes=base64.urlsafe_b64decode(self.request.GET["upload_id"]))
 
@@ -193,13 +203,13 @@ class ArticlesetUploadOptionsView(BaseMixin, FormView):
             if len(x) > maxlen:
                 x = x[:maxlen] + "..."
             return '{}'.format(x)
-            
+
+        existing_fields = self.project.get_used_properties(only_favourites=True)
         for f in self.script_fields:
             # HACK: use initial['values'] to pass values to the respective form.__init__.
             values = [abbrev_and_quote(x, 20) for x in f.values if x] if f.values else []
             data = {'label': f.label, 'values': values}
 
-            existing_fields = self.project.get_used_properties(only_favourites=True)
             if f.suggested_destination:
                 if f.suggested_destination in CORE_FIELDS or f.suggested_destination in existing_fields:
                     data['destination'] = f.suggested_destination
@@ -211,22 +221,29 @@ class ArticlesetUploadOptionsView(BaseMixin, FormView):
             yield data
 
     def get_initial(self):
-        return list(self.initial_data())
+        # Determining the fields means parsing the uploaded file, so only do it once per upload
+        initial = self.upload.get("initial")
+        if initial is None:
+            initial = self.upload["initial"] = list(self.initial_data())
+            self.request.session.modified = True
+        # ArticleUploadFieldForm pops 'values' from its initial data, so do not hand out the stored dicts
+        return [dict(data) for data in initial]
         
-    def get_form_class(self):
-        formset = forms.formset_factory(ArticleUploadFieldForm, formset=ArticleUploadFormSet)
-        formset.project = self.project
-        formset.management_initial = {"upload_id": self.upload_id}
-        return formset
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs["project"] = self.project
+        kwargs["management_initial"] = {"upload_id": self.upload_id}
+        return kwargs
 
     @property
+    @cached
     def upload(self):
-        key = "upload__{self.upload_id}".format(**locals())
-        return self.request.session[key]
+        return self.request.session["upload__{}".format(self.upload_id)]
 
     @property
+    @cached
     def script_class(self):
-        script = Plugin.objects.get(id=self.upload['script']).get_class()
+        script = Plugin.objects.only("class_name").get(id=self.upload['script']).get_class()
         return script
 
 
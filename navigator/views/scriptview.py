@@ -17,6 +17,7 @@
 # License along with AmCAT.  If not, see <http://www.gnu.org/licenses/>.  #
 ###########################################################################
 import tempfile, os
+import shutil
 import base64
 from urllib.parse import urlencode
 
@@ -121,12 +122,12 @@ def get_temporary_file_dict(fo):
     """
     Creates a non-deleting, named, temporary file for `fo`.
 
-    @type fo: method .chunks() should return list of list of bytes
+    @type fo: django.core.files.uploadedfile.UploadedFile
     @rtype: string
     """
+    fo.seek(0)
     with tempfile.NamedTemporaryFile(delete=False) as dest:
-        for chunk in fo.chunks():
-            dest.write(chunk)
+        shutil.copyfileobj(fo, dest, 1024 * 1024)
 
     os.chmod(dest.name, 0o644)
     return {
@@ -34,7 +34,7 @@ class TestSplitArticles(amcattest.AmCATTestCase):
             "add_to_new_set": "test_article_split_view_set",
             "remove_from_all_sets": "on",
             "add_splitted_to_new_set": "",
-            "sentence-%s" % sentences[1].id: "on"
+            "sentence": [sentences[1].id]
         })
 
         new_set = ArticleSet.objects.filter(name="test_article_split_view_set")
@@ -207,6 +207,12 @@ TEMPLATES = [{
     }
 }]
 
+if not DEBUG:
+    # Keep compiled templates in memory, instead of parsing them on every render
+    TEMPLATES[0]['OPTIONS']['loaders'] = (
+        ('django.template.loaders.cached.Loader', TEMPLATES[0]['OPTIONS']['loaders']),
+    )
+
 DEFAULT_FROM_EMAIL = "wat200@vu.nl"
 
 FIXTURE_DIRS = (os.path.join(ROOT, "amcat/models"),)